@@ -1,10 +1,283 @@
 import math
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from decimal import Decimal
-from typing import Any, Dict, List, Optional, Tuple
+from functools import partial
+from typing import Any, DefaultDict, Dict, List, Optional, Sequence, Tuple
 
 from .config import ProcessorConfig
 from .enums import MatchStatus
 
+# (min_line_qty, min_order_amount, blacklisted, policy_filters)
+SupplierRuleSummary = Tuple[Optional[Any], Optional[float], bool, Any]
+
+_EMPTY_RULES: SupplierRuleSummary = (None, None, False, None)
+
+# Orders below either size are classified serially even with parallel_items.
+# Classification costs a few microseconds per candidate, while pickling items
+# and results in the parent alone adds 20-50% of that and a pool takes ~10 ms
+# to start; below ~20k candidates the serial pass wins.
+_PARALLEL_MIN_ITEMS = 64
+_PARALLEL_MIN_CANDIDATES = 20_000
+
+# Match statuses whose lines are handed to the solver.
+_SOLVER_MATCH_STATUSES = frozenset(
+    {MatchStatus.OK.value, MatchStatus.MANUAL_OVERRIDE.value}
+)
+
+
+def _summarize_rules(rules: Optional[Dict[str, Any]]) -> SupplierRuleSummary:
+    """Flatten supplier rules into the fields used by candidate filtering."""
+    if not rules:
+        return _EMPTY_RULES
+    constraints = rules.get("constraints")
+    policies = rules.get("policies")
+    if not constraints and not policies:
+        return _EMPTY_RULES
+    constraints = constraints or {}
+    policies = policies or {}
+    min_order_amount = constraints.get("min_order_amount")
+    return (
+        constraints.get("min_line_qty"),
+        float(min_order_amount) if min_order_amount is not None else None,
+        bool(policies.get("blacklisted")),
+        policies.get("filters"),
+    )
+
+
+def _worth_parallelizing(items: List[Dict[str, Any]]) -> bool:
+    """Check whether an order is large enough to amortise process-pool overhead."""
+    if len(items) < _PARALLEL_MIN_ITEMS:
+        return False
+    total_candidates = sum(len(item.get("candidates", [])) for item in items)
+    return total_candidates >= _PARALLEL_MIN_CANDIDATES
+
+
+def _classify_item(
+    item: Dict[str, Any],
+    supplier_cache: Dict[Any, SupplierRuleSummary],
+    price_margin: Optional[float],
+    allow_insufficient: bool,
+    insufficient_threshold: float,
+) -> Dict[str, Any]:
+    """
+    Filter and classify the candidates of a single order line.
+
+    Module-level and free of processor state so it can run in a worker process.
+    """
+    match_status = item["match"]["status"]
+    qty = item["qty"]
+    raw_candidates = item.get("candidates", [])
+    raw_candidates_count = len(raw_candidates)
+
+    classified_candidates: List[Dict[str, Any]] = []
+    rule_summaries: List[SupplierRuleSummary] = []
+    min_price: Optional[float] = None
+
+    # Phase 1: normalise numerics and track the cheapest offer in one scan.
+    for candidate in raw_candidates:
+        candidate_info = candidate.copy()
+        candidate_rules = candidate_info.pop("supplier_rules", None)
+        rule_summaries.append(
+            _summarize_rules(candidate_rules)
+            if candidate_rules
+            else supplier_cache.get(candidate_info.get("supplier_id"), _EMPTY_RULES)
+        )
+
+        # Exact class checks: cheaper than isinstance on the float/int common case.
+        price = candidate_info.get("price")
+        if price.__class__ is Decimal:
+            price = float(price)
+        candidate_info["price"] = price
+        if price is not None and (min_price is None or price < min_price):
+            min_price = price
+
+        availability_qty = candidate_info.get("availability_qty")
+        if availability_qty.__class__ is Decimal:
+            availability_qty = float(availability_qty)
+        candidate_info["availability_qty"] = availability_qty
+
+        classified_candidates.append(candidate_info)
+
+    max_allowed_price: Optional[float] = None
+    if min_price is not None and price_margin is not None:
+        max_allowed_price = round(
+            float(min_price) * (1 + price_margin), 2
+        )
+
+    available_candidates: List[Dict[str, Any]] = []
+    rejection_summary: DefaultDict[str, int] = defaultdict(int)
+    min_order_amount_risks: List[Dict[str, Any]] = []
+
+    # Phase 2: apply business rules to the normalised candidates.
+    for candidate_info, rule_summary in zip(classified_candidates, rule_summaries):
+        supplier_id = candidate_info.get("supplier_id")
+        price = candidate_info["price"]
+        availability_qty = candidate_info["availability_qty"]
+        (
+            min_line_qty,
+            min_order_amount,
+            blacklisted,
+            default_policy_filters,
+        ) = rule_summary
+
+        reason_details: List[Dict[str, Any]] = []
+        rejection_reasons: List[str] = []
+
+        # Inlined is_candidate_available: the sufficient case needs no division.
+        if availability_qty is None or availability_qty >= qty:
+            sufficient_qty = True
+            is_available = True
+            shortage_pct = None
+        else:
+            sufficient_qty = False
+            shortage_ratio = (qty - availability_qty) / qty
+            is_available = (
+                allow_insufficient and shortage_ratio <= insufficient_threshold
+            )
+            shortage_pct = shortage_ratio * 100
+        candidate_info["is_available"] = is_available
+        candidate_info["sufficient_qty"] = sufficient_qty
+        candidate_info["shortage_pct"] = (
+            round(float(shortage_pct), 2)
+            if shortage_pct is not None
+            else None
+        )
+
+        if not is_available:
+            details = {
+                "supplier_id": supplier_id,
+                "requested": qty,
+                "available": availability_qty,
+                "shortage_pct": candidate_info["shortage_pct"],
+            }
+            rejection_reasons.append("insufficient_quantity")
+            reason_details.append(
+                {"code": "insufficient_quantity", "details": details}
+            )
+        elif shortage_pct is not None:
+            candidate_info["availability_details"] = {
+                "supplier_id": supplier_id,
+                "requested": qty,
+                "available": availability_qty,
+                "shortage_pct": candidate_info["shortage_pct"],
+            }
+
+        if min_line_qty and qty < min_line_qty:
+            details = {
+                "supplier_id": supplier_id,
+                "qty": qty,
+                "min_line_qty": min_line_qty,
+            }
+            rejection_reasons.append("below_min_line_qty")
+            reason_details.append(
+                {"code": "below_min_line_qty", "details": details}
+            )
+
+        if max_allowed_price is not None and price is not None:
+            if price > max_allowed_price:
+                details = {
+                    "supplier_id": supplier_id,
+                    "price": price,
+                    "max_allowed_price": max_allowed_price,
+                }
+                rejection_reasons.append("price_above_margin")
+                reason_details.append(
+                    {"code": "price_above_margin", "details": details}
+                )
+
+        if blacklisted:
+            details = {"supplier_id": supplier_id}
+            rejection_reasons.append("supplier_blacklisted")
+            reason_details.append(
+                {"code": "supplier_blacklisted", "details": details}
+            )
+
+        policy_filters = (
+            candidate_info.get("policy_filters") or default_policy_filters
+        )
+        if policy_filters:
+            details = {"supplier_id": supplier_id, "policies": policy_filters}
+            rejection_reasons.append("filtered_out_by_policy")
+            reason_details.append(
+                {"code": "filtered_out_by_policy", "details": details}
+            )
+
+        line_total = None
+        if price is not None:
+            line_total = float(price) * qty
+            candidate_info["line_total"] = line_total
+
+        if min_order_amount and line_total is not None:
+            delta_amount = min_order_amount - line_total
+            if delta_amount > 0:
+                suggested_qty_increase = (
+                    math.ceil(delta_amount / price) if price else None
+                )
+                moa_details = {
+                    "supplier_id": supplier_id,
+                    "required_amount": min_order_amount,
+                    "actual_amount": round(line_total, 2),
+                    "delta_amount": round(delta_amount, 2),
+                    "suggested_qty_increase": suggested_qty_increase,
+                }
+                candidate_info["min_order_amount_risk"] = True
+                candidate_info["min_order_amount_details"] = moa_details
+                reason_details.append(
+                    {"code": "min_order_amount_risk", "details": moa_details}
+                )
+                min_order_amount_risks.append(
+                    {
+                        "line_no": item["line_no"],
+                        **moa_details,
+                    }
+                )
+            else:
+                candidate_info["min_order_amount_risk"] = False
+        else:
+            candidate_info["min_order_amount_risk"] = False
+
+        if rejection_reasons:
+            candidate_info["eligible_for_solver"] = False
+            candidate_info["rejected_reason"] = rejection_reasons[0]
+            candidate_info["rejection_reasons"] = rejection_reasons
+            candidate_info["rejection_details"] = reason_details[0]["details"]
+            candidate_info["reason_details"] = reason_details
+            for reason_code in rejection_reasons:
+                rejection_summary[reason_code] += 1
+        else:
+            candidate_info["eligible_for_solver"] = True
+            candidate_info["rejected_reason"] = None
+            candidate_info["rejection_reasons"] = rejection_reasons
+            candidate_info["rejection_details"] = None
+            candidate_info["reason_details"] = reason_details
+            available_candidates.append(candidate_info)
+
+    goes_to_solver = (
+        match_status in _SOLVER_MATCH_STATUSES and len(available_candidates) > 0
+    )
+
+    # Single copy of the item, extended in place; key order matches the input.
+    enriched_item = item.copy()
+    enriched_item.pop("candidates", None)
+    enriched_item.update(
+        {
+            "candidates_raw_count": raw_candidates_count,
+            "candidates_filtered_count": len(available_candidates),
+            "candidates_total_count": len(classified_candidates),
+            "candidates_available_count": len(available_candidates),
+            "candidates": available_candidates,
+            "candidates_all": classified_candidates,
+            "rejection_summary": dict(rejection_summary),
+            "max_allowed_price": max_allowed_price,
+            "min_order_amount_risks": min_order_amount_risks,
+            "goes_to_solver": goes_to_solver,
+        }
+    )
+
+    return enriched_item
+
 
 class CandidateMixin:
     """
@@ -13,9 +286,23 @@ class CandidateMixin:
     Expects the consuming class to define:
         - self.config: ProcessorConfig
         - self.log(message: str): logging helper
+        - self._item_pool: Optional[ProcessPoolExecutor], initially None
     """
 
     config: ProcessorConfig  # Protocol hint
+    _item_pool: Optional[ProcessPoolExecutor]
+
+    def _get_item_pool(self) -> ProcessPoolExecutor:
+        """Return the worker pool for line classification, started on first use."""
+        if self._item_pool is None:
+            self._item_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+        return self._item_pool
+
+    def _shutdown_item_pool(self) -> None:
+        """Stop the classification worker pool, if one was started."""
+        if self._item_pool is not None:
+            self._item_pool.shutdown()
+            self._item_pool = None
 
     def classify_match_status(self, score: Optional[float]) -> MatchStatus:
         """
@@ -27,14 +314,33 @@ class CandidateMixin:
         Returns:
             MatchStatus classification
         """
-        if score is None:
-            return MatchStatus.NO_MATCH
+        return self.classify_match_status_batch([score])[0]
+
+    def classify_match_status_batch(
+        self,
+        scores: Sequence[Optional[float]],
+    ) -> List[MatchStatus]:
+        """
+        Classify a batch of similarity scores in one pass.
 
-        if score >= self.config.sim_threshold_ok:
-            return MatchStatus.OK
-        if score >= self.config.sim_threshold_low:
-            return MatchStatus.LOW_CONFIDENCE
-        return MatchStatus.NO_MATCH
+        The thresholds are resolved once for the whole batch;
+        classify_match_status delegates here for a single score.
+        """
+        threshold_ok = self.config.sim_threshold_ok
+        threshold_low = self.config.sim_threshold_low
+
+        statuses: List[MatchStatus] = []
+        append = statuses.append
+        for score in scores:
+            if score is None:
+                append(MatchStatus.NO_MATCH)
+            elif score >= threshold_ok:
+                append(MatchStatus.OK)
+            elif score >= threshold_low:
+                append(MatchStatus.LOW_CONFIDENCE)
+            else:
+                append(MatchStatus.NO_MATCH)
+        return statuses
 
     def is_candidate_available(
         self,
@@ -77,18 +383,27 @@ class CandidateMixin:
         if not candidates or self.config.price_margin is None:
             return candidates
 
-        min_price = min(c["price"] for c in candidates)
-        max_allowed = min_price * (1 + self.config.price_margin)
+        prices = [c["price"] for c in candidates]
+        max_allowed = min(prices) * (1 + self.config.price_margin)
 
-        return [c for c in candidates if c["price"] <= max_allowed]
+        return [c for c, price in zip(candidates, prices) if price <= max_allowed]
 
     def classify_candidates(
         self,
         candidates: List[Dict[str, Any]],
         qty_requested: int,
+        in_place: bool = False,
     ) -> List[Dict[str, Any]]:
         """
         Classify and enrich candidates with availability status.
+
+        Args:
+            candidates: Candidate dicts to classify
+            qty_requested: Quantity requested in order
+            in_place: Enrich the given dicts instead of copies
+
+        Returns:
+            Enriched candidates (the input dicts when in_place=True)
         """
         enriched: List[Dict[str, Any]] = []
 
@@ -98,21 +413,22 @@ class CandidateMixin:
                 qty_requested, qty_available
             )
 
-            enriched.append(
-                {
-                    **candidate,
-                    "is_available": is_available,
-                    "sufficient_qty": qty_available is None
-                    or qty_available >= qty_requested,
-                    "shortage_pct": shortage_pct,
-                }
+            entry = candidate if in_place else candidate.copy()
+            entry["is_available"] = is_available
+            entry["sufficient_qty"] = (
+                qty_available is None or qty_available >= qty_requested
             )
+            entry["shortage_pct"] = shortage_pct
+            enriched.append(entry)
 
         return enriched
 
     def filter_and_classify_candidates(self, candidates_payload: Dict[str, Any]) -> Dict[str, Any]:
         """
         Filter and classify candidates using business rules.
+
+        Lines are independent, so with config.parallel_items large orders are
+        classified in a process pool; small orders always run serially.
         """
         self.log("Step 6: Filtering and classifying candidates...")
 
@@ -120,214 +436,37 @@ class CandidateMixin:
         suppliers = {
             s["supplier_id"]: s for s in candidates_payload.get("suppliers", [])
         }
+        supplier_cache: Dict[Any, SupplierRuleSummary] = {
+            supplier_id: _summarize_rules(s.get("rules"))
+            for supplier_id, s in suppliers.items()
+        }
 
-        enriched_items: List[Dict[str, Any]] = []
-        items_with_candidates = 0
-        items_for_solver = 0
-
-        for item in items:
-            match_status = item["match"]["status"]
-            qty = item["qty"]
-            raw_candidates = item.get("candidates", [])
-            raw_candidates_count = len(raw_candidates)
-
-            price_values = [
-                float(c["price"]) for c in raw_candidates if c.get("price") is not None
-            ]
-            max_allowed_price: Optional[float] = None
-            if price_values and self.config.price_margin is not None:
-                min_price = min(price_values)
-                max_allowed_price = round(min_price * (1 + self.config.price_margin), 2)
-
-            classified_candidates: List[Dict[str, Any]] = []
-            rejection_summary: Dict[str, int] = {}
-            min_order_amount_risks: List[Dict[str, Any]] = []
-
-            for candidate in raw_candidates:
-                candidate_info = {
-                    k: v for k, v in candidate.items() if k != "supplier_rules"
-                }
-                supplier_id = candidate_info.get("supplier_id")
-                supplier_meta = suppliers.get(supplier_id, {})
-                supplier_rules = (
-                    candidate.get("supplier_rules")
-                    or supplier_meta.get("rules")
-                    or {}
-                )
-                constraints = (
-                    supplier_rules.get("constraints", {}) if supplier_rules else {}
-                )
-                policies = supplier_rules.get("policies", {}) if supplier_rules else {}
-
-                price = candidate_info.get("price")
-                if isinstance(price, Decimal):
-                    price = float(price)
-                candidate_info["price"] = price
-
-                availability_qty = candidate.get("availability_qty")
-                if isinstance(availability_qty, Decimal):
-                    availability_qty = float(availability_qty)
-                candidate_info["availability_qty"] = availability_qty
-
-                reason_details: List[Dict[str, Any]] = []
-                rejection_reasons: List[str] = []
-
-                is_available, shortage_pct = self.is_candidate_available(
-                    qty, availability_qty
-                )
-                candidate_info["is_available"] = is_available
-                candidate_info["sufficient_qty"] = availability_qty is None or (
-                    availability_qty >= qty
-                )
-                candidate_info["shortage_pct"] = (
-                    round(float(shortage_pct), 2)
-                    if shortage_pct is not None
-                    else None
-                )
-
-                if not is_available:
-                    details = {
-                        "supplier_id": supplier_id,
-                        "requested": qty,
-                        "available": availability_qty,
-                        "shortage_pct": candidate_info["shortage_pct"],
-                    }
-                    rejection_reasons.append("insufficient_quantity")
-                    reason_details.append(
-                        {"code": "insufficient_quantity", "details": details}
-                    )
-                elif shortage_pct is not None:
-                    candidate_info["availability_details"] = {
-                        "supplier_id": supplier_id,
-                        "requested": qty,
-                        "available": availability_qty,
-                        "shortage_pct": candidate_info["shortage_pct"],
-                    }
+        classify_item = partial(
+            _classify_item,
+            supplier_cache=supplier_cache,
+            price_margin=self.config.price_margin,
+            allow_insufficient=self.config.allow_insufficient,
+            insufficient_threshold=self.config.insufficient_threshold,
+        )
 
-                min_line_qty = constraints.get("min_line_qty")
-                if min_line_qty and qty < min_line_qty:
-                    details = {
-                        "supplier_id": supplier_id,
-                        "qty": qty,
-                        "min_line_qty": min_line_qty,
-                    }
-                    rejection_reasons.append("below_min_line_qty")
-                    reason_details.append(
-                        {"code": "below_min_line_qty", "details": details}
-                    )
-
-                if max_allowed_price is not None and price is not None:
-                    if price > max_allowed_price:
-                        details = {
-                            "supplier_id": supplier_id,
-                            "price": price,
-                            "max_allowed_price": max_allowed_price,
-                        }
-                        rejection_reasons.append("price_above_margin")
-                        reason_details.append(
-                            {"code": "price_above_margin", "details": details}
-                        )
-
-                if policies.get("blacklisted"):
-                    details = {"supplier_id": supplier_id}
-                    rejection_reasons.append("supplier_blacklisted")
-                    reason_details.append(
-                        {"code": "supplier_blacklisted", "details": details}
-                    )
-
-                policy_filters = candidate.get("policy_filters") or policies.get(
-                    "filters"
-                )
-                if policy_filters:
-                    details = {"supplier_id": supplier_id, "policies": policy_filters}
-                    rejection_reasons.append("filtered_out_by_policy")
-                    reason_details.append(
-                        {"code": "filtered_out_by_policy", "details": details}
-                    )
-
-                min_order_amount = constraints.get("min_order_amount")
-                line_total = None
-                if price is not None:
-                    line_total = float(price) * qty
-                    candidate_info["line_total"] = line_total
-
-                if min_order_amount and line_total is not None:
-                    delta_amount = float(min_order_amount) - line_total
-                    if delta_amount > 0:
-                        suggested_qty_increase = (
-                            math.ceil(delta_amount / price) if price else None
-                        )
-                        moa_details = {
-                            "supplier_id": supplier_id,
-                            "required_amount": float(min_order_amount),
-                            "actual_amount": round(line_total, 2),
-                            "delta_amount": round(delta_amount, 2),
-                            "suggested_qty_increase": suggested_qty_increase,
-                        }
-                        candidate_info["min_order_amount_risk"] = True
-                        candidate_info["min_order_amount_details"] = moa_details
-                        reason_details.append(
-                            {"code": "min_order_amount_risk", "details": moa_details}
-                        )
-                        min_order_amount_risks.append(
-                            {
-                                "line_no": item["line_no"],
-                                **moa_details,
-                            }
-                        )
-                    else:
-                        candidate_info["min_order_amount_risk"] = False
-                else:
-                    candidate_info["min_order_amount_risk"] = False
-
-                candidate_info["eligible_for_solver"] = len(rejection_reasons) == 0
-                candidate_info["rejected_reason"] = (
-                    rejection_reasons[0] if rejection_reasons else None
-                )
-                candidate_info["rejection_reasons"] = rejection_reasons
-                candidate_info["rejection_details"] = (
-                    reason_details[0]["details"] if rejection_reasons else None
+        if self.config.parallel_items and _worth_parallelizing(items):
+            # The pool lives as long as the processor, so later orders reuse it.
+            pool = self._get_item_pool()
+            workers = os.cpu_count() or 1
+            enriched_items = list(
+                pool.map(
+                    classify_item,
+                    items,
+                    chunksize=max(1, len(items) // (workers * 4)),
                 )
-                candidate_info["reason_details"] = reason_details
-
-                if rejection_reasons:
-                    for reason_code in rejection_reasons:
-                        rejection_summary[reason_code] = (
-                            rejection_summary.get(reason_code, 0) + 1
-                        )
-
-                classified_candidates.append(candidate_info)
-
-            available_candidates = [
-                c for c in classified_candidates if c.get("eligible_for_solver")
-            ]
-
-            goes_to_solver = (
-                match_status in ["ok", "manual_override"] and len(available_candidates) > 0
             )
+        else:
+            enriched_items = [classify_item(item) for item in items]
 
-            item_snapshot = {k: v for k, v in item.items() if k != "candidates"}
-            enriched_item = {
-                **item_snapshot,
-                "candidates_raw_count": raw_candidates_count,
-                "candidates_filtered_count": len(available_candidates),
-                "candidates_total_count": len(classified_candidates),
-                "candidates_available_count": len(available_candidates),
-                "candidates": available_candidates,
-                "candidates_all": classified_candidates,
-                "rejection_summary": rejection_summary,
-                "max_allowed_price": max_allowed_price,
-                "min_order_amount_risks": min_order_amount_risks,
-                "goes_to_solver": goes_to_solver,
-            }
-
-            enriched_items.append(enriched_item)
-
-            if raw_candidates_count > 0:
-                items_with_candidates += 1
-
-            if goes_to_solver:
-                items_for_solver += 1
+        items_with_candidates = sum(
+            1 for item in enriched_items if item["candidates_raw_count"] > 0
+        )
+        items_for_solver = sum(1 for item in enriched_items if item["goes_to_solver"])
 
         result = {
             "order_id": candidates_payload["order_id"],
@@ -1,13 +1,23 @@
+"""
+Canonical processor configuration.
+
+All business-rule, container-matching and solver settings live on
+ProcessorConfig; other modules read them from self.config.
+"""
+
 from dataclasses import dataclass
 from typing import Dict, Literal, Optional
 
+__all__ = ["ProcessorConfig"]
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class ProcessorConfig:
     """
     Configuration for the order processor business rules.
 
     Centralises all tunable thresholds so they are not embedded in SQL.
+    Instances are immutable; use dataclasses.replace to derive a variant.
     """
 
     # Matching thresholds
@@ -28,6 +38,15 @@ class ProcessorConfig:
     # Solver settings
     solver_timeout: int = 60  # seconds
     optimization_priority: Literal["suppliers_count", "container_match"] = "suppliers_count"
+    solver_workers: Optional[int] = None  # CP-SAT search workers; None = min(8, CPU count)
+    # CP-SAT tuning knobs; None keeps CP-SAT's own default
+    solver_relative_gap_limit: Optional[float] = None  # stop once within this gap of the bound
+    solver_linearization_level: Optional[int] = None
+    solver_probing_level: Optional[int] = None
+    solver_symmetry_level: Optional[int] = None
+
+    # Execution settings
+    parallel_items: bool = False  # Classify large orders' lines in worker processes
 
     def to_dict(self) -> Dict[str, Optional[float]]:
         """Convert the configuration to a serialisable dictionary."""
@@ -41,4 +60,10 @@ class ProcessorConfig:
             "alike_tolerance": self.alike_tolerance,
             "solver_timeout": self.solver_timeout,
             "optimization_priority": self.optimization_priority,
+            "solver_workers": self.solver_workers,
+            "solver_relative_gap_limit": self.solver_relative_gap_limit,
+            "solver_linearization_level": self.solver_linearization_level,
+            "solver_probing_level": self.solver_probing_level,
+            "solver_symmetry_level": self.solver_symmetry_level,
+            "parallel_items": self.parallel_items,
         }
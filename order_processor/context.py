@@ -1,4 +1,3 @@
-from copy import deepcopy
 from typing import Any, Dict, List, Optional
 
 
@@ -29,7 +28,12 @@ class ContextMixin:
         }
 
     def _strip_supplier_rules(self, payload: Any) -> Any:
-        """Remove supplier rules blobs from payload for safe logging/output."""
+        """
+        Copy payload without supplier rules blobs for safe logging/output.
+
+        Containers are rebuilt while walking, so the result never shares
+        dicts or lists with the input; leaves are returned as-is.
+        """
         if isinstance(payload, dict):
             has_supplier_id = "supplier_id" in payload
             result: Dict[str, Any] = {}
@@ -45,10 +49,10 @@ class ContextMixin:
         return payload
 
     def _sanitize_for_context(self, payload: Any) -> Any:
-        """Deep copy payload stripping supplier rules for pipeline context."""
+        """Copy payload stripping supplier rules for pipeline context."""
         if payload is None:
             return None
-        return self._strip_supplier_rules(deepcopy(payload))
+        return self._strip_supplier_rules(payload)
 
     def _build_line_diagnostics(self, enriched_payload: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Produce compact diagnostics per line for downstream debugging."""
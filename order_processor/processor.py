@@ -1,9 +1,10 @@
-from copy import deepcopy
-from datetime import datetime
+import time
+from concurrent.futures import ProcessPoolExecutor
 from typing import Any, Dict, Optional
 
 import psycopg2
 import traceback
+from psycopg2.pool import AbstractConnectionPool
 
 from .candidate import CandidateMixin
 from .config import ProcessorConfig
@@ -25,47 +26,70 @@ class OrderProcessor(
 
     def __init__(
         self,
-        db_config: Dict[str, str],
+        db_config: Optional[Dict[str, str]],
         config: Optional[ProcessorConfig] = None,
         verbose: bool = True,
+        pool: Optional[AbstractConnectionPool] = None,
     ):
-        self.conn = psycopg2.connect(**db_config)
+        # With a pool, the connection is borrowed for this processor's lifetime
+        # so the whole pipeline still runs in one transaction.
+        self.pool = pool
+        if pool is not None:
+            self.conn = pool.getconn()
+        else:
+            self.conn = psycopg2.connect(**db_config)
+        self._register_json_loads()
         self.config = config or ProcessorConfig()
         self.verbose = verbose
         self.last_solver_info: Dict[str, Any] = {}
         self.last_solution: Optional[Dict[str, Any]] = None
         self.last_enriched_payload: Optional[Dict[str, Any]] = None
+        self._item_pool: Optional[ProcessPoolExecutor] = None
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if exc_type:
-            self.conn.rollback()
-        else:
-            self.conn.commit()
-        self.conn.close()
+        try:
+            if exc_type:
+                self.conn.rollback()
+            else:
+                self.conn.commit()
+        finally:
+            self._shutdown_item_pool()
+            if self.pool is not None:
+                self.pool.putconn(self.conn)
+            else:
+                self.conn.close()
+
+    def log(self, message: str, *args: Any) -> None:
+        """
+        Print log message if verbose.
 
-    def log(self, message: str) -> None:
-        """Print log message if verbose."""
-        if self.verbose:
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            print(f"[{timestamp}] {message}")
+        Optional args are %-formatted into message only when the line is
+        actually printed.
+        """
+        if not self.verbose:
+            return
+        if args:
+            message = message % args
+        print(f"[{time.strftime('%H:%M:%S')}] {message}")
 
     def process_order(self, message_json: Dict[str, Any]) -> Dict[str, Any]:
         """
         Main pipeline: Process order from JSON to solution.
         """
-        self.log("=" * 70)
-        self.log("ORDER PROCESSING PIPELINE V3")
-        self.log("=" * 70)
-        self.log("Configuration:")
-        self.log(f"  Similarity threshold (OK): {self.config.sim_threshold_ok}")
-        self.log(f"  Similarity threshold (Low): {self.config.sim_threshold_low}")
-        self.log(f"  Allow insufficient: {self.config.allow_insufficient}")
-        self.log(f"  Insufficient threshold: {self.config.insufficient_threshold}")
-        self.log(f"  Price margin: {self.config.price_margin}")
-        self.log("=" * 70)
+        if self.verbose:
+            self.log("=" * 70)
+            self.log("ORDER PROCESSING PIPELINE V3")
+            self.log("=" * 70)
+            self.log("Configuration:")
+            self.log(f"  Similarity threshold (OK): {self.config.sim_threshold_ok}")
+            self.log(f"  Similarity threshold (Low): {self.config.sim_threshold_low}")
+            self.log(f"  Allow insufficient: {self.config.allow_insufficient}")
+            self.log(f"  Insufficient threshold: {self.config.insufficient_threshold}")
+            self.log(f"  Price margin: {self.config.price_margin}")
+            self.log("=" * 70)
 
         try:
             self.last_solution = None
@@ -93,13 +117,13 @@ class OrderProcessor(
                         "diagnostics": line_diagnostics,
                     },
                     "order_status": order_status.value,
-                    "status_details": deepcopy(status_details),
+                    "status_details": status_details,
                 }
             )
 
             if enriched_payload["stats"]["items_for_solver"] == 0:
                 self.log("=" * 70)
-                self.log(f"ORDER STATUS: {order_status.value}")
+                self.log("ORDER STATUS: %s", order_status.value)
                 self.log("No items ready for solver - cannot find optimal solution")
                 self.log("=" * 70)
                 pipeline_context["solver"] = {
@@ -160,11 +184,11 @@ class OrderProcessor(
                     # FIX: Ensure order_status consistency
                     pipeline_context["order_status"] = order_status.value
                     pipeline_context["status_details"] = self._sanitize_for_context(
-                        deepcopy(status_details)
+                        status_details
                     )
                 if self.last_enriched_payload:
                     pipeline_context["enriched_payload"] = self._sanitize_for_context(
-                        deepcopy(self.last_enriched_payload)
+                        self.last_enriched_payload
                     )
                 return {
                     "success": False,
@@ -192,6 +216,6 @@ class OrderProcessor(
             return output
 
         except Exception as exc:
-            self.log(f"ERROR: {exc}")
+            self.log("ERROR: %s", exc)
             traceback.print_exc()
             raise
@@ -1,11 +1,109 @@
-from decimal import Decimal
-from typing import Any, Dict, List
-
-from psycopg2.extras import Json, RealDictCursor
+import io
+import re
+import weakref
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Tuple
+
+from psycopg2.extras import (
+    Json,
+    RealDictCursor,
+    execute_values,
+    register_default_json,
+    register_default_jsonb,
+)
 
 from .config import ProcessorConfig
 from .enums import MatchStatus, OrderStatus
 
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib json module
+    orjson = None
+
+
+class _Json(Json):
+    """Json adapter that encodes with orjson when it is installed."""
+
+    def dumps(self, obj: Any) -> str:
+        if orjson is None:
+            return super().dumps(obj)
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+# A plain ASCII decimal number, as NUMERIC accepts it.
+_NUMERIC_RE = re.compile(
+    r"\s*([+-]?(?:[0-9]+(?:\.[0-9]*)?|\.[0-9]+)(?:[eE][+-]?[0-9]+)?)\s*"
+)
+
+# Rows per round-trip when streaming candidate items.
+_CANDIDATE_FETCH_SIZE = 100
+
+# Row count from which bulk inserts switch from INSERT ... VALUES to COPY.
+_COPY_MIN_ROWS = 200
+
+
+def _numeric_text(value: str) -> Optional[str]:
+    """Return value as text NUMERIC can parse, or None if it is not a number."""
+    match = _NUMERIC_RE.fullmatch(value)
+    if match:
+        return match.group(1)
+    # Other spellings Decimal accepts (non-ASCII digits, underscores) are normalized
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        return None
+    return str(number) if number.is_finite() else None
+
+
+# Names of the statements already prepared on each connection.
+_PREPARED: "weakref.WeakKeyDictionary[Any, set]" = weakref.WeakKeyDictionary()
+
+
+def _execute_prepared(cursor: Any, name: str, sql: str, params: tuple) -> None:
+    """
+    Execute sql (with $n placeholders) as the prepared statement name.
+
+    The statement is prepared on first use per connection, so connections
+    reused across orders (e.g. from a pool) skip parsing and planning. The
+    first use sends PREPARE and EXECUTE together, costing no extra round-trip.
+    """
+    prepared = _PREPARED.setdefault(cursor.connection, set())
+    execute = f"EXECUTE {name} ({', '.join(['%s'] * len(params))})"
+    if name in prepared:
+        cursor.execute(execute, params)
+        return
+    # Literal % in the statement text must survive parameter interpolation.
+    cursor.execute(f"PREPARE {name} AS {sql.replace('%', '%%')}; {execute}", params)
+    prepared.add(name)
+
+
+def _render_values(cursor: Any, template: str, rows: List[tuple]) -> bytes:
+    """Render rows into a VALUES list body, the way execute_values does."""
+    return b",".join(cursor.mogrify(template, row) for row in rows)
+
+
+def _copy_text_field(value: Any) -> str:
+    """Encode one value in COPY text format."""
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _copy_rows(cursor: Any, target: str, rows: List[tuple]) -> None:
+    """Bulk load rows into target ("table (col, ...)") with COPY FROM STDIN."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_text_field(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {target} FROM STDIN", buffer)
+
 
 class RepositoryMixin:
     """
@@ -15,11 +113,17 @@ class RepositoryMixin:
         - self.conn: psycopg2 connection
         - self.config: ProcessorConfig
         - self.log(message: str)
-        - self.classify_match_status: callable returning MatchStatus
+        - self.classify_match_status_batch: callable returning List[MatchStatus]
     """
 
     config: ProcessorConfig
 
+    def _register_json_loads(self) -> None:
+        """Decode json/jsonb results on self.conn with orjson when it is installed."""
+        if orjson is not None:
+            register_default_json(self.conn, loads=orjson.loads)
+            register_default_jsonb(self.conn, loads=orjson.loads)
+
     def ingest_message(self, message_json: Dict[str, Any]) -> int:
         """
         Ingest message into ingest_messages table.
@@ -43,13 +147,15 @@ class RepositoryMixin:
 
         validation_passed = headers.get("validation_passed") == "True"
 
-        cursor.execute(
+        _execute_prepared(
+            cursor,
+            "op_ingest_message",
             """
             INSERT INTO ingest_messages (
                 idempotency_key, provider, service, parsing_schema,
                 classification, headers, payload, original_msg, validation_passed
             )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
             ON CONFLICT (idempotency_key)
             DO UPDATE SET
                 headers = EXCLUDED.headers,
@@ -63,9 +169,9 @@ class RepositoryMixin:
                 service,
                 parsing_schema,
                 classification,
-                Json(headers),
-                Json(data.get("parsed_data", {})),
-                Json(data.get("original_message", {})),
+                _Json(headers),
+                _Json(data.get("parsed_data", {})),
+                _Json(data.get("original_message", {})),
                 validation_passed,
             ),
         )
@@ -99,18 +205,21 @@ class RepositoryMixin:
             "city": parsed.get("city"),
         }
 
-        cursor.execute(
+        _execute_prepared(
+            cursor,
+            "op_create_order",
             """
             INSERT INTO orders (source_msg_id, buyer_contact)
-            VALUES (%s, %s)
+            VALUES ($1, $2)
             RETURNING order_id
         """,
-            (msg_id, Json(buyer_contact)),
+            (msg_id, _Json(buyer_contact)),
         )
 
         order_id = cursor.fetchone()[0]
 
         items = parsed.get("items", [])
+        rows = []
         for line_no, item in enumerate(items, start=1):
             height_text = None
             height_min = None
@@ -120,21 +229,17 @@ class RepositoryMixin:
             height = item.get("height")
             if height:
                 height_unit = item.get("height_unit", "см")
+                # Bounds are passed as text; the NUMERIC columns cast them.
                 if isinstance(height, str) and "-" in height:
                     height_text = height
                     parts = height.split("-")
-                    try:
-                        height_min = Decimal(parts[0])
-                        height_max = Decimal(parts[1])
-                    except Exception:
-                        pass
+                    height_min = _numeric_text(parts[0])
+                    if height_min is not None:
+                        height_max = _numeric_text(parts[1])
                 else:
                     height_text = str(height)
-                    try:
-                        height_min = Decimal(str(height))
-                        height_max = height_min
-                    except Exception:
-                        pass
+                    height_min = _numeric_text(height_text)
+                    height_max = height_min
 
             # Parse container information
             pack_code_requested = None
@@ -153,29 +258,16 @@ class RepositoryMixin:
                 if "-" in container_size_str:
                     pack_code_requested = f"{container_type}{container_size_str}"
                     parts = container_size_str.split("-")
-                    try:
-                        container_size_min = Decimal(parts[0])
-                        container_size_max = Decimal(parts[1])
-                    except Exception:
-                        pass
+                    container_size_min = _numeric_text(parts[0])
+                    if container_size_min is not None:
+                        container_size_max = _numeric_text(parts[1])
                 else:
                     # Single value
                     pack_code_requested = f"{container_type}{container_size_str}"
-                    try:
-                        container_size_min = Decimal(container_size_str)
-                        container_size_max = container_size_min
-                    except Exception:
-                        pass
+                    container_size_min = _numeric_text(container_size_str)
+                    container_size_max = container_size_min
 
-            cursor.execute(
-                """
-                INSERT INTO order_items (
-                    order_id, line_no, raw_name, lang, qty, qty_unit,
-                    height_text, height_min, height_max, height_unit,
-                    pack_code_requested, container_type, container_size_min, container_size_max
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """,
+            rows.append(
                 (
                     order_id,
                     line_no,
@@ -191,7 +283,22 @@ class RepositoryMixin:
                     container_type,
                     container_size_min,
                     container_size_max,
-                ),
+                )
+            )
+
+        if rows:
+            execute_values(
+                cursor,
+                """
+                INSERT INTO order_items (
+                    order_id, line_no, raw_name, lang, qty, qty_unit,
+                    height_text, height_min, height_max, height_unit,
+                    pack_code_requested, container_type, container_size_min, container_size_max
+                )
+                VALUES %s
+            """,
+                rows,
+                page_size=500,
             )
 
         cursor.close()
@@ -230,50 +337,76 @@ class RepositoryMixin:
 
         stats = {"ok": 0, "low_confidence": 0, "no_match": 0}
 
-        for match in matches:
-            score = match.get("score")
-            status = self.classify_match_status(score)
+        # Pull each column out once instead of re-indexing the row dicts.
+        scores = [match.get("score") for match in matches]
+        line_nos = [match["line_no"] for match in matches]
+        plant_ids = [match["plant_id"] for match in matches]
+        canonical_names = [match["canonical_name"] for match in matches]
+        matched_synonyms = [match["matched_synonym"] for match in matches]
 
-            cursor.execute(
-                """
-                UPDATE order_items
-                SET plant_id = %s,
-                    match_state = %s,
-                    match_score = %s,
-                    match_meta = %s,
-                    modified_by = 'system',
-                    modified_at = now()
-                WHERE order_id = %s AND line_no = %s
-            """,
+        statuses = self.classify_match_status_batch(scores)
+
+        threshold_meta = {
+            "classification_threshold_ok": self.config.sim_threshold_ok,
+            "classification_threshold_low": self.config.sim_threshold_low,
+        }
+
+        rows = []
+        for plant_id, status, score, canonical_name, matched_synonym, line_no in zip(
+            plant_ids, statuses, scores, canonical_names, matched_synonyms, line_nos
+        ):
+            rows.append(
                 (
-                    match["plant_id"],
+                    plant_id,
                     status.value,
                     score,
-                    Json(
+                    _Json(
                         {
-                            "canonical_name": match["canonical_name"],
-                            "matched_synonym": match["matched_synonym"],
-                            "classification_threshold_ok": self.config.sim_threshold_ok,
-                            "classification_threshold_low": self.config.sim_threshold_low,
+                            "canonical_name": canonical_name,
+                            "matched_synonym": matched_synonym,
+                            **threshold_meta,
                         }
                     ),
                     order_id,
-                    match["line_no"],
-                ),
+                    line_no,
+                )
             )
-
             stats[status.value] += 1
 
+        if rows:
+            execute_values(
+                cursor,
+                """
+                UPDATE order_items
+                SET plant_id = v.plant_id,
+                    match_state = v.match_state,
+                    match_score = v.match_score,
+                    match_meta = v.match_meta,
+                    modified_by = 'system',
+                    modified_at = now()
+                FROM (VALUES %s) AS v(
+                    plant_id, match_state, match_score, match_meta, order_id, line_no
+                )
+                WHERE order_items.order_id = v.order_id
+                  AND order_items.line_no = v.line_no
+            """,
+                rows,
+                template=(
+                    "(%s::integer, %s::text, %s::double precision, %s::jsonb,"
+                    " %s::integer, %s::integer)"
+                ),
+                page_size=500,
+            )
+
         cursor.execute(
             """
-            SELECT line_no FROM order_items
-            WHERE order_id = %s AND line_no NOT IN %s
+            SELECT count(*) FROM order_items
+            WHERE order_id = %s AND line_no <> ALL(%s::integer[])
         """,
-            (order_id, tuple(m["line_no"] for m in matches) if matches else (-1,)),
+            (order_id, line_nos),
         )
 
-        no_match_items = cursor.fetchall()
-        stats["no_match"] += len(no_match_items)
+        stats["no_match"] += cursor.fetchone()[0]
 
         self.log(
             "  -> Classified: "
@@ -291,7 +424,10 @@ class RepositoryMixin:
         """
         self.log("Step 5: Getting all candidates (raw)...")
 
-        cursor = self.conn.cursor()
+        # Server-side cursor: items arrive one row each, in batches, so the
+        # whole payload is never held as a single JSON document.
+        cursor = self.conn.cursor(name="order_candidates")
+        cursor.itersize = _CANDIDATE_FETCH_SIZE
 
         # Pass container matching parameters from config
         allow_alike = self.config.allow_alike_containers
@@ -299,14 +435,30 @@ class RepositoryMixin:
 
         cursor.execute(
             """
-            SELECT fn_get_order_candidates(%s, %s, %s)
+            WITH payload AS MATERIALIZED (
+                SELECT fn_get_order_candidates(%s, %s, %s)::json AS doc
+            )
+            SELECT field.key, field.value, 0 AS part, field.ord
+            FROM payload, json_each(payload.doc) WITH ORDINALITY AS field(key, value, ord)
+            WHERE field.key <> 'items'
+            UNION ALL
+            SELECT NULL, item.value, 1, item.ord
+            FROM payload, json_array_elements(payload.doc -> 'items')
+                WITH ORDINALITY AS item(value, ord)
+            ORDER BY part, ord
         """,
             (order_id, allow_alike, alike_tolerance),
         )
 
-        candidates = cursor.fetchone()[0]
+        candidates: Dict[str, Any] = {}
+        items: List[Dict[str, Any]] = []
+        for key, value, _part, _ord in cursor:
+            if key is None:
+                items.append(value)
+            else:
+                candidates[key] = value
+        candidates["items"] = items
 
-        items = candidates.get("items", [])
         total_candidates = sum(len(item.get("candidates", [])) for item in items)
 
         self.log(
@@ -326,23 +478,15 @@ class RepositoryMixin:
         cursor.close()
         return row.get("summary") or {}
 
-    def _calculate_discount(self, subtotal: Decimal, rules: Dict[str, Any]) -> Decimal:
-        """Calculate total discount based on supplier rules."""
-        discounts = rules.get("discounts", {})
-        order_discounts = discounts.get("order_amount", [])
-        discount_pct = Decimal("0")
-
-        for tier in sorted(
-            order_discounts, key=lambda x: x["threshold"], reverse=True
-        ):
-            if subtotal >= tier["threshold"]:
-                discount_pct = Decimal(str(tier["percent"]))
-                break
-
-        return subtotal * (discount_pct / 100)
+    def _apply_discount(
+        self, subtotal: Decimal, rules: Dict[str, Any]
+    ) -> Tuple[Decimal, Dict[str, Any]]:
+        """
+        Resolve the order-amount discount tier for a supplier basket.
 
-    def _get_discount_breakdown(self, subtotal: Decimal, rules: Dict[str, Any]) -> Dict[str, Any]:
-        """Get discount breakdown for details."""
+        Returns:
+            (discount_amount, discount_breakdown); breakdown is {} when no tier applies
+        """
         discounts = rules.get("discounts", {})
         order_discounts = discounts.get("order_amount", [])
 
@@ -350,14 +494,16 @@ class RepositoryMixin:
             order_discounts, key=lambda x: x["threshold"], reverse=True
         ):
             if subtotal >= tier["threshold"]:
-                return {
+                discount_pct = Decimal(str(tier["percent"]))
+                breakdown = {
                     "type": "order_amount",
                     "threshold": tier["threshold"],
                     "percent": tier["percent"],
-                    "amount": float(subtotal * Decimal(str(tier["percent"])) / 100),
+                    "amount": float(subtotal * discount_pct / 100),
                 }
+                return subtotal * (discount_pct / 100), breakdown
 
-        return {}
+        return Decimal("0"), {}
 
     def record_assignment(
         self,
@@ -373,21 +519,38 @@ class RepositoryMixin:
 
         cursor = self.conn.cursor(cursor_factory=RealDictCursor)
 
-        cursor.execute(
+        supplier_totals: Dict[int, Decimal] = {}
+        for assignment in solution["assignments"]:
+            supplier_id = assignment["supplier_id"]
+            supplier_totals.setdefault(supplier_id, Decimal("0"))
+            supplier_totals[supplier_id] += Decimal(str(assignment["price"])) * assignment[
+                "qty"
+            ]
+
+        # Open the run and fetch the rules of the suppliers used in one round-trip;
+        # the LEFT JOIN keeps the run row when there are no suppliers.
+        _execute_prepared(
+            cursor,
+            "op_open_run",
             """
-            INSERT INTO assignment_runs (
-                order_id, solver, objective, config, status, meta
+            WITH run AS (
+                INSERT INTO assignment_runs (
+                    order_id, solver, objective, config, status, meta
+                )
+                VALUES ($1, $2, $3, $4, $5, $6)
+                RETURNING run_id
             )
-            VALUES (%s, %s, %s, %s, %s, %s)
-            RETURNING run_id
+            SELECT run.run_id, s.supplier_id, s.rules
+            FROM run
+            LEFT JOIN suppliers s ON s.supplier_id = ANY($7::integer[])
         """,
             (
                 order_id,
                 "ortools_cp_sat",
                 "minimize_suppliers",
-                Json(self.config.to_dict()),
+                _Json(self.config.to_dict()),
                 solution["status"],
-                Json(
+                _Json(
                     {
                         "num_suppliers": solution["num_suppliers"],
                         "objective_value": solution["objective_value"],
@@ -396,51 +559,23 @@ class RepositoryMixin:
                         "status_details": status_details,
                     }
                 ),
+                list(supplier_totals),
             ),
         )
 
-        run_id = cursor.fetchone()["run_id"]
-
-        for assignment in solution["assignments"]:
-            cursor.execute(
-                """
-                INSERT INTO item_assignments (
-                    run_id, order_id, line_no, supplier_id, pack_code, pack_match_status, unit_price, currency
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """,
-                (
-                    run_id,
-                    order_id,
-                    assignment["line_no"],
-                    assignment["supplier_id"],
-                    assignment["pack_code"],
-                    assignment.get("pack_match_status"),
-                    assignment["price"],
-                    "RUB",
-                ),
-            )
-
-        supplier_totals: Dict[int, Decimal] = {}
-        for assignment in solution["assignments"]:
-            supplier_id = assignment["supplier_id"]
-            supplier_totals.setdefault(supplier_id, Decimal("0"))
-            supplier_totals[supplier_id] += Decimal(str(assignment["price"])) * assignment[
-                "qty"
-            ]
+        run_rows = cursor.fetchall()
+        run_id = run_rows[0]["run_id"]
+        rules_by_supplier: Dict[int, Dict[str, Any]] = {
+            row["supplier_id"]: row["rules"]
+            for row in run_rows
+            if row["supplier_id"] is not None
+        }
 
+        basket_rows = []
         for supplier_id, subtotal in supplier_totals.items():
-            cursor.execute(
-                """
-                SELECT rules FROM suppliers WHERE supplier_id = %s
-            """,
-                (supplier_id,),
-            )
-
-            supplier = cursor.fetchone()
-            rules = supplier["rules"] if supplier else {}
+            rules = rules_by_supplier.get(supplier_id, {})
 
-            discount_amt = self._calculate_discount(subtotal, rules)
+            discount_amt, discount_breakdown = self._apply_discount(subtotal, rules)
 
             extra_fees = Decimal("0")
             extra = rules.get("extra", {})
@@ -452,13 +587,7 @@ class RepositoryMixin:
 
             total = subtotal - discount_amt + extra_fees
 
-            cursor.execute(
-                """
-                INSERT INTO supplier_baskets (
-                    run_id, supplier_id, subtotal, discount_amt, extra_fees, total, details
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """,
+            basket_rows.append(
                 (
                     run_id,
                     supplier_id,
@@ -466,23 +595,67 @@ class RepositoryMixin:
                     float(discount_amt),
                     float(extra_fees),
                     float(total),
-                    Json(
+                    _Json(
                         {
                             "rules_applied": rules,
-                            "discount_breakdown": self._get_discount_breakdown(
-                                subtotal, rules
-                            ),
+                            "discount_breakdown": discount_breakdown,
                         }
                     ),
-                ),
+                )
             )
 
-        cursor.execute(
-            """
+        assignment_rows = [
+            (
+                run_id,
+                order_id,
+                assignment["line_no"],
+                assignment["supplier_id"],
+                assignment["pack_code"],
+                assignment.get("pack_match_status"),
+                assignment["price"],
+                "RUB",
+            )
+            for assignment in solution["assignments"]
+        ]
+
+        # The remaining writes return nothing, so send them in one round-trip.
+        statements: List[bytes] = []
+        if len(assignment_rows) >= _COPY_MIN_ROWS:
+            _copy_rows(
+                cursor,
+                "item_assignments (run_id, order_id, line_no, supplier_id, pack_code, "
+                "pack_match_status, unit_price, currency)",
+                assignment_rows,
+            )
+        elif assignment_rows:
+            statements.append(
+                b"""
+                INSERT INTO item_assignments (
+                    run_id, order_id, line_no, supplier_id, pack_code, pack_match_status, unit_price, currency
+                )
+                VALUES """
+                + _render_values(
+                    cursor, "(%s, %s, %s, %s, %s, %s, %s, %s)", assignment_rows
+                )
+            )
+        if basket_rows:
+            statements.append(
+                b"""
+                INSERT INTO supplier_baskets (
+                    run_id, supplier_id, subtotal, discount_amt, extra_fees, total, details
+                )
+                VALUES """
+                + _render_values(cursor, "(%s, %s, %s, %s, %s, %s, %s)", basket_rows)
+            )
+        statements.append(
+            cursor.mogrify(
+                """
             UPDATE assignment_runs SET finished_at = now() WHERE run_id = %s
         """,
-            (run_id,),
+                (run_id,),
+            )
         )
+        cursor.execute(b";".join(statements))
 
         self.log(f"  -> Assignment recorded: run_id={run_id}")
 
@@ -501,72 +674,80 @@ class RepositoryMixin:
         """
         self.log("Step 10: Generating output...")
 
-        order_summary = self.get_order_summary(order_id)
-
         cursor = self.conn.cursor(cursor_factory=RealDictCursor)
 
-        # Get assignment run
+        # Run, item assignments (with container info), supplier baskets (with
+        # contact info) and the order summary in a single round-trip. Timestamps
+        # and the cost total are selected as native columns to keep their types.
         cursor.execute(
             """
-            SELECT * FROM assignment_runs WHERE run_id = %s
+            SELECT
+                ar.started_at,
+                ar.finished_at,
+                row_to_json(ar) AS run,
+                (
+                    SELECT coalesce(json_agg(row_to_json(a) ORDER BY a.line_no), '[]')
+                    FROM (
+                        SELECT
+                            ia.*,
+                            oi.raw_name,
+                            oi.qty,
+                            oi.qty_unit,
+                            oi.pack_code_requested,
+                            oi.container_type,
+                            oi.container_size_min,
+                            oi.container_size_max,
+                            p.canonical_name,
+                            s.name as supplier_name
+                        FROM item_assignments ia
+                        JOIN order_items oi ON oi.order_id = ia.order_id AND oi.line_no = ia.line_no
+                        LEFT JOIN plants p ON p.plant_id = oi.plant_id
+                        JOIN suppliers s ON s.supplier_id = ia.supplier_id
+                        WHERE ia.run_id = ar.run_id
+                    ) a
+                ) AS assignments,
+                (
+                    SELECT coalesce(json_agg(row_to_json(b) ORDER BY b.total DESC), '[]')
+                    FROM (
+                        SELECT
+                            sb.*,
+                            s.name as supplier_name,
+                            s.phone,
+                            s.email,
+                            s.telegram
+                        FROM supplier_baskets sb
+                        JOIN suppliers s ON s.supplier_id = sb.supplier_id
+                        WHERE sb.run_id = ar.run_id
+                    ) b
+                ) AS baskets,
+                (
+                    SELECT coalesce(sum(sb.total), 0)
+                    FROM supplier_baskets sb
+                    WHERE sb.run_id = ar.run_id
+                ) AS total_cost,
+                fn_get_order_summary(%s) AS summary
+            FROM assignment_runs ar
+            WHERE ar.run_id = %s
         """,
-            (run_id,),
+            (order_id, run_id),
         )
 
-        run = cursor.fetchone()
+        row = cursor.fetchone()
+        cursor.close()
 
-        # Get item assignments with container info
-        cursor.execute(
-            """
-            SELECT
-                ia.*,
-                oi.raw_name,
-                oi.qty,
-                oi.qty_unit,
-                oi.pack_code_requested,
-                oi.container_type,
-                oi.container_size_min,
-                oi.container_size_max,
-                p.canonical_name,
-                s.name as supplier_name
-            FROM item_assignments ia
-            JOIN order_items oi ON oi.order_id = ia.order_id AND oi.line_no = ia.line_no
-            LEFT JOIN plants p ON p.plant_id = oi.plant_id
-            JOIN suppliers s ON s.supplier_id = ia.supplier_id
-            WHERE ia.run_id = %s
-            ORDER BY ia.line_no
-        """,
-            (run_id,),
-        )
+        run = row["run"]
+        started_at = row["started_at"]
+        finished_at = row["finished_at"]
+        assignments = row["assignments"]
+        baskets = row["baskets"]
+        order_summary = row["summary"] or {}
 
-        assignments = cursor.fetchall()
         shortage_lookup: Dict[tuple, Any] = {}
         if getattr(self, "last_solution", None):
             for assignment in self.last_solution.get("assignments", []):
                 key = (assignment.get("line_no"), assignment.get("supplier_id"))
                 shortage_lookup[key] = assignment.get("shortage_pct")
 
-        # Get supplier baskets with contact info
-        cursor.execute(
-            """
-            SELECT
-                sb.*,
-                s.name as supplier_name,
-                s.phone,
-                s.email,
-                s.telegram
-            FROM supplier_baskets sb
-            JOIN suppliers s ON s.supplier_id = sb.supplier_id
-            WHERE sb.run_id = %s
-            ORDER BY sb.total DESC
-        """,
-            (run_id,),
-        )
-
-        baskets = cursor.fetchall()
-
-        cursor.close()
-
         # Build assignment entries with nested structure
         assignment_entries: List[Dict[str, Any]] = []
         for a in assignments:
@@ -624,7 +805,7 @@ class RepositoryMixin:
             assignment_entries.append(entry)
 
         # Build output
-        total_cost = float(sum(b["total"] for b in baskets))
+        total_cost = float(row["total_cost"])
 
         output = {
             "success": True,
@@ -639,12 +820,10 @@ class RepositoryMixin:
                 "objective": run["objective"],
                 "num_suppliers": len(baskets),
                 "total_cost": total_cost,
-                "solved_at": (
-                    run["started_at"].isoformat() if run["started_at"] else None
-                ),
+                "solved_at": started_at.isoformat() if started_at else None,
                 "solve_time_seconds": (
-                    (run["finished_at"] - run["started_at"]).total_seconds()
-                    if run["finished_at"] and run["started_at"]
+                    (finished_at - started_at).total_seconds()
+                    if finished_at and started_at
                     else None
                 ),
             },
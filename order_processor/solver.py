@@ -1,9 +1,25 @@
-from typing import Any, Dict, List, Optional, Tuple
+import os
+import threading
+from collections import OrderedDict
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from ortools.sat.python import cp_model
 
 from .config import ProcessorConfig
 
+BuiltModel = Tuple[cp_model.CpModel, List[cp_model.IntVar], Dict[int, cp_model.IntVar]]
+
+# Default cap on CP-SAT search workers; the portfolio gains little beyond this.
+_MAX_SOLVER_WORKERS = 8
+
+# Built models keyed by their inputs, most recently used last. Processors may
+# run on several threads, so every access holds _MODEL_CACHE_LOCK, and cached
+# models are never solved directly: each solve works on its own clone.
+_MODEL_CACHE: "OrderedDict[tuple, BuiltModel]" = OrderedDict()
+_MODEL_CACHE_SIZE = 32
+_MODEL_CACHE_LOCK = threading.Lock()
+
 
 class SolverMixin:
     """
@@ -12,11 +28,13 @@ class SolverMixin:
     Expects:
         - self.config: ProcessorConfig
         - self.log(message: str)
+        - self.verbose: bool
         - self.last_solver_info: Dict[str, Any]
         - self.last_solution: Optional[Dict[str, Any]]
     """
 
     config: ProcessorConfig
+    verbose: bool
     last_solver_info: Dict[str, Any]
     last_solution: Optional[Dict[str, Any]]
 
@@ -66,121 +84,244 @@ class SolverMixin:
             )
             return None
 
-        # Build flat list of candidates with indices
-        all_candidates: List[Dict[str, Any]] = []
+        # Flatten candidates into parallel columns indexed by candidate index.
+        # Unpriced offers cannot be costed or assigned, so they never become
+        # variables; business-rule rejections already happened upstream.
+        cand_items: List[int] = []
+        cand_lines: List[int] = []
+        cand_qtys: List[Any] = []
+        cand_suppliers: List[int] = []
+        cand_pack_codes: List[Optional[str]] = []
+        cand_pack_statuses: List[Optional[str]] = []
+        cand_prices: List[Any] = []
+        cand_shortages: List[Optional[float]] = []
         item_candidate_map: Dict[int, List[int]] = {}  # item_idx -> [candidate_indices]
+        by_supplier: Dict[int, List[int]] = {}  # supplier_id -> [candidate_indices]
 
         for item_idx, item in enumerate(solver_items):
-            candidate_indices = []
+            line_no = item["line_no"]
+            qty = item["qty"]
+            start = len(cand_items)
             for candidate in item["candidates"]:
-                candidate_idx = len(all_candidates)
-                candidate_indices.append(candidate_idx)
-                all_candidates.append({
-                    "candidate_idx": candidate_idx,
-                    "item_idx": item_idx,
-                    "line_no": item["line_no"],
-                    "qty": item["qty"],
-                    "supplier_id": candidate["supplier_id"],
-                    "pack_code": candidate.get("pack_code"),
-                    "pack_match_status": candidate.get("pack_match_status"),
-                    "price": candidate["price"],
-                    "shortage_pct": candidate.get("shortage_pct"),
-                })
-            item_candidate_map[item_idx] = candidate_indices
-
-        supplier_ids = sorted(set(c["supplier_id"] for c in all_candidates))
+                price = candidate["price"]
+                if price is None:
+                    continue
+                supplier_id = candidate["supplier_id"]
+                # Insertion-ordered buckets; no throwaway default list per candidate
+                bucket = by_supplier.get(supplier_id)
+                if bucket is None:
+                    bucket = by_supplier[supplier_id] = []
+                bucket.append(len(cand_items))
+                cand_items.append(item_idx)
+                cand_lines.append(line_no)
+                cand_qtys.append(qty)
+                cand_suppliers.append(supplier_id)
+                cand_pack_codes.append(candidate.get("pack_code"))
+                cand_pack_statuses.append(candidate.get("pack_match_status"))
+                cand_prices.append(price)
+                cand_shortages.append(candidate.get("shortage_pct"))
+            item_candidate_map[item_idx] = list(range(start, len(cand_items)))
+
+        num_candidates = len(cand_items)
+        supplier_ids = sorted(by_supplier)
 
         self.last_solver_info["model_stats"].update({
             "suppliers_considered": len(supplier_ids),
-            "total_candidates": len(all_candidates),
+            "total_candidates": num_candidates,
         })
 
         self.log(
             f"  -> Problem: {len(solver_items)} items, "
-            f"{len(all_candidates)} candidates, {len(supplier_ids)} suppliers"
+            f"{num_candidates} candidates, {len(supplier_ids)} suppliers"
         )
 
-        model = cp_model.CpModel()
-
-        # x[candidate_idx] - binary variable for each candidate
-        x: Dict[int, cp_model.IntVar] = {}
-        for cand in all_candidates:
-            cand_idx = cand["candidate_idx"]
-            x[cand_idx] = model.NewBoolVar(
-                f"x_c{cand_idx}_i{cand['line_no']}_s{cand['supplier_id']}"
-            )
-
-        # y[supplier_id] - binary variable for each supplier
-        y = {s_id: model.NewBoolVar(f"y_s{s_id}") for s_id in supplier_ids}
-
-        # Constraint: Each item must select exactly 1 candidate
-        for item_idx, candidate_indices in item_candidate_map.items():
-            model.Add(sum(x[c_idx] for c_idx in candidate_indices) == 1)
-
-        # Constraint: x[candidate] <= y[supplier] (link candidates to suppliers)
-        for cand in all_candidates:
-            model.Add(x[cand["candidate_idx"]] <= y[cand["supplier_id"]])
+        # Resolve each supplier's constraints once, outside the candidate loops
+        supplier_constraints: Dict[int, Dict[str, Any]] = {
+            s_id: suppliers_info[s_id].get("rules", {}).get("constraints", {})
+            for s_id in supplier_ids
+        }
 
-        # Constraint: Min order amount per supplier
-        for supplier_id in supplier_ids:
-            rules = suppliers_info[supplier_id].get("rules", {})
-            constraints = rules.get("constraints", {})
+        # Min order amount per supplier: coefficients for the model plus the audit trail
+        min_order_terms: List[Tuple[int, int, Tuple[Tuple[int, int], ...]]] = []
+        for supplier_id, constraints in supplier_constraints.items():
             min_order_amount = constraints.get("min_order_amount")
 
             if min_order_amount:
-                supplier_candidates = [c for c in all_candidates if c["supplier_id"] == supplier_id]
                 audit_entry = {
                     "supplier_id": supplier_id,
                     "min_order_amount": float(min_order_amount),
                     "lines": [],
                 }
 
+                # One pass over this supplier's bucket yields the model terms,
+                # the audit lines and their running total.
                 terms = []
-                for cand in supplier_candidates:
-                    price = cand["price"]
-                    if price is None:
-                        continue
-                    qty = cand["qty"]
-                    line_total = float(price) * qty
-                    amount_cents = int(line_total * 100)
-                    terms.append(amount_cents * x[cand["candidate_idx"]])
-
-                    audit_entry["lines"].append({
-                        "line_no": cand["line_no"],
+                audit_lines = audit_entry["lines"]
+                line_total_sum = 0
+                for c_idx in by_supplier[supplier_id]:
+                    price = cand_prices[c_idx]
+                    unit_price = float(price)
+                    qty = cand_qtys[c_idx]
+                    line_total = unit_price * qty
+                    # Exact cents: the line amount is rounded once, after scaling by qty
+                    amount_cents = int(
+                        (Decimal(str(price)) * Decimal(str(qty)) * 100).to_integral_value(
+                            rounding=ROUND_HALF_UP
+                        )
+                    )
+                    terms.append((c_idx, amount_cents))
+
+                    rounded_total = round(line_total, 2)
+                    line_total_sum += rounded_total
+                    audit_lines.append({
+                        "line_no": cand_lines[c_idx],
                         "qty": qty,
-                        "unit_price": float(price),
-                        "line_total": round(line_total, 2),
-                        "pack_code": cand["pack_code"],
+                        "unit_price": unit_price,
+                        "line_total": rounded_total,
+                        "pack_code": cand_pack_codes[c_idx],
                     })
 
                 if terms:
-                    min_amount_cents = int(float(min_order_amount) * 100)
-                    model.Add(sum(terms) >= min_amount_cents * y[supplier_id])
-                    audit_entry["line_total_sum"] = round(
-                        sum(line["line_total"] for line in audit_entry["lines"]), 2
+                    min_amount_cents = int(
+                        (Decimal(str(min_order_amount)) * 100).to_integral_value(
+                            rounding=ROUND_HALF_UP
+                        )
                     )
+                    min_order_terms.append((supplier_id, min_amount_cents, tuple(terms)))
+                    audit_entry["line_total_sum"] = round(line_total_sum, 2)
                     self.last_solver_info["constraint_audit"]["min_order_amount"].append(audit_entry)
 
-        # Objective function based on optimization_priority
         if self.config.optimization_priority == "container_match":
-            # Minimize: suppliers * 1000 + container_penalties
             # penalty = 1 for 'alike', 0 for 'exactly'
-            container_penalties = []
-            for cand in all_candidates:
-                penalty = 1 if cand.get("pack_match_status") == "alike" else 0
-                container_penalties.append(penalty * x[cand["candidate_idx"]])
+            penalties: Optional[Tuple[int, ...]] = tuple(
+                1 if pack_status == "alike" else 0 for pack_status in cand_pack_statuses
+            )
+        else:
+            penalties = None
 
-            model.Minimize(
-                sum(y[s_id] for s_id in supplier_ids) * 1000 + sum(container_penalties)
+        # With one candidate per item the assignment is forced; when it also meets
+        # every min order amount it is the unique feasible, hence optimal, solution.
+        forced = all(len(indices) == 1 for indices in item_candidate_map.values()) and all(
+            sum(amount_cents for _, amount_cents in terms) >= min_amount_cents
+            for _, min_amount_cents, terms in min_order_terms
+        )
+
+        if forced:
+            self.log("  -> Every item has a single candidate: assignment is forced, skipping CP-SAT")
+            status_name = "OPTIMAL"
+            selected_suppliers = list(supplier_ids)
+            chosen: Sequence[int] = range(num_candidates)
+            objective_value = float(
+                len(supplier_ids) * 1000 + sum(penalties)
+                if penalties is not None
+                else len(supplier_ids)
+            )
+            self.last_solver_info.update(
+                {
+                    "status": status_name,
+                    "solver_status_code": cp_model.OPTIMAL,
+                    "solve_wall_time_seconds": 0.0,
+                    "best_objective_bound": objective_value,
+                    "shortcut": "forced_assignment",
+                }
             )
-            self.log("  -> Optimization: prioritize exact container matches, then minimize suppliers")
         else:
-            # Default: minimize number of suppliers only
-            model.Minimize(sum(y[s_id] for s_id in supplier_ids))
-            self.log("  -> Optimization: minimize number of suppliers")
+            # The model depends only on this key, so identical problems reuse a built model.
+            # The item count covers items left without candidates (infeasible).
+            model_key = (
+                len(solver_items),
+                tuple(zip(cand_items, cand_suppliers)),
+                tuple(min_order_terms),
+                penalties,
+            )
+            with _MODEL_CACHE_LOCK:
+                cached = _MODEL_CACHE.get(model_key)
+                if cached is not None:
+                    _MODEL_CACHE.move_to_end(model_key)
+            if cached is not None:
+                # Variables refer to the model by index, so they carry over to the clone
+                model, x, y = cached
+                model = model.clone()
+            else:
+                model, x, y = self._build_model(
+                    cand_lines,
+                    cand_suppliers,
+                    item_candidate_map,
+                    by_supplier,
+                    supplier_ids,
+                    min_order_terms,
+                    penalties,
+                )
+                with _MODEL_CACHE_LOCK:
+                    _MODEL_CACHE[model_key] = (model.clone(), x, y)
+                    if len(_MODEL_CACHE) > _MODEL_CACHE_SIZE:
+                        _MODEL_CACHE.popitem(last=False)
+
+            if penalties is not None:
+                self.log("  -> Optimization: prioritize exact container matches, then minimize suppliers")
+            else:
+                self.log("  -> Optimization: minimize number of suppliers")
+
+            solver = self._solve_model(model)
+            if solver is None:
+                return None
+
+            status_name = self.last_solver_info["status"]
+            objective_value = solver.ObjectiveValue()
+            selected_suppliers = [s_id for s_id in supplier_ids if solver.Value(y[s_id]) == 1]
+            chosen = [c_idx for c_idx, x_c in enumerate(x) if solver.Value(x_c) == 1]
+
+        # Extract solution
+        assignments = [
+            {
+                "line_no": cand_lines[c_idx],
+                "supplier_id": cand_suppliers[c_idx],
+                "pack_code": cand_pack_codes[c_idx],
+                "pack_match_status": cand_pack_statuses[c_idx],
+                "price": float(cand_prices[c_idx]),
+                "qty": cand_qtys[c_idx],
+                "shortage_pct": cand_shortages[c_idx],
+            }
+            for c_idx in chosen
+        ]
+
+        solution = {
+            "status": status_name,
+            "objective_value": objective_value,
+            "num_suppliers": len(selected_suppliers),
+            "assignments": assignments,
+            "suppliers_used": selected_suppliers,
+        }
+        self.last_solver_info["objective_value"] = objective_value
+        self.last_solver_info["suppliers_selected"] = selected_suppliers
 
+        self.log(f"  -> Solution: {solution['num_suppliers']} suppliers used")
+        self.log(f"     Suppliers: {solution['suppliers_used']}")
+
+        return solution
+
+    def _solve_model(self, model: cp_model.CpModel) -> Optional[cp_model.CpSolver]:
+        """
+        Run CP-SAT on model and record the outcome in last_solver_info.
+
+        Returns:
+            The solver if it found a solution, otherwise None
+        """
         solver = cp_model.CpSolver()
-        solver.parameters.max_time_in_seconds = float(self.config.solver_timeout)
+        params = solver.parameters
+        params.max_time_in_seconds = float(self.config.solver_timeout)
+        params.num_workers = self.config.solver_workers or min(
+            _MAX_SOLVER_WORKERS, os.cpu_count() or 1
+        )
+        params.log_search_progress = self.verbose
+        for name, value in (
+            ("relative_gap_limit", self.config.solver_relative_gap_limit),
+            ("linearization_level", self.config.solver_linearization_level),
+            ("cp_model_probing_level", self.config.solver_probing_level),
+            ("symmetry_level", self.config.solver_symmetry_level),
+        ):
+            if value is not None:
+                setattr(params, name, value)
 
         self.log("  -> Solving...")
         status = solver.Solve(model)
@@ -208,33 +349,63 @@ class SolverMixin:
             self.last_solver_info["reason"] = "solver_returned_no_solution"
             return None
 
-        # Extract solution
-        selected_suppliers = [s_id for s_id in supplier_ids if solver.Value(y[s_id]) == 1]
-
-        assignments = []
-        for cand in all_candidates:
-            if solver.Value(x[cand["candidate_idx"]]) == 1:
-                assignments.append({
-                    "line_no": cand["line_no"],
-                    "supplier_id": cand["supplier_id"],
-                    "pack_code": cand["pack_code"],
-                    "pack_match_status": cand.get("pack_match_status"),
-                    "price": float(cand["price"]),
-                    "qty": cand["qty"],
-                    "shortage_pct": cand.get("shortage_pct"),
-                })
+        return solver
+
+    @staticmethod
+    def _build_model(
+        cand_lines: List[int],
+        cand_suppliers: List[int],
+        item_candidate_map: Dict[int, List[int]],
+        by_supplier: Dict[int, List[int]],
+        supplier_ids: List[int],
+        min_order_terms: List[Tuple[int, int, Tuple[Tuple[int, int], ...]]],
+        penalties: Optional[Tuple[int, ...]],
+    ) -> BuiltModel:
+        """
+        Build the CP-SAT model.
 
-        solution = {
-            "status": solver.StatusName(status),
-            "objective_value": solver.ObjectiveValue(),
-            "num_suppliers": len(selected_suppliers),
-            "assignments": assignments,
-            "suppliers_used": selected_suppliers,
-        }
-        self.last_solver_info["objective_value"] = solver.ObjectiveValue()
-        self.last_solver_info["suppliers_selected"] = selected_suppliers
+        Returns:
+            (model, x indexed by candidate index, y by supplier id)
+        """
+        model = cp_model.CpModel()
 
-        self.log(f"  -> Solution: {solution['num_suppliers']} suppliers used")
-        self.log(f"     Suppliers: {solution['suppliers_used']}")
+        # x[candidate_idx] - binary variable for each candidate
+        x: List[cp_model.IntVar] = [
+            model.NewBoolVar(f"x_c{cand_idx}_i{line_no}_s{supplier_id}")
+            for cand_idx, (line_no, supplier_id) in enumerate(zip(cand_lines, cand_suppliers))
+        ]
 
-        return solution
+        # y[supplier_id] - binary variable for each supplier
+        y = {s_id: model.NewBoolVar(f"y_s{s_id}") for s_id in supplier_ids}
+
+        # Constraint: Each item must select exactly 1 candidate
+        for item_idx, candidate_indices in item_candidate_map.items():
+            model.AddExactlyOne([x[c_idx] for c_idx in candidate_indices])
+
+        # Constraint: y[supplier] <=> OR of its candidates, as clauses:
+        # each chosen candidate implies y, and y needs one chosen candidate.
+        for supplier_id, candidate_indices in by_supplier.items():
+            y_s = y[supplier_id]
+            for c_idx in candidate_indices:
+                model.AddImplication(x[c_idx], y_s)
+            model.AddBoolOr([x[c_idx] for c_idx in candidate_indices] + [y_s.Not()])
+
+        # Constraint: Min order amount per supplier
+        for supplier_id, min_amount_cents, terms in min_order_terms:
+            model.Add(
+                sum(amount_cents * x[c_idx] for c_idx, amount_cents in terms)
+                >= min_amount_cents * y[supplier_id]
+            )
+
+        # Objective function based on optimization_priority
+        if penalties is not None:
+            # Minimize: suppliers * 1000 + container_penalties
+            model.Minimize(
+                sum(y[s_id] for s_id in supplier_ids) * 1000
+                + sum(penalty * x_c for x_c, penalty in zip(x, penalties))
+            )
+        else:
+            # Default: minimize number of suppliers only
+            model.Minimize(sum(y[s_id] for s_id in supplier_ids))
+
+        return model, x, y
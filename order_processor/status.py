@@ -1,8 +1,31 @@
+import math
 from typing import Any, Dict, List, Optional, Set, Tuple
 
 from .config import ProcessorConfig
 from .enums import MatchStatus, OrderStatus
 
+# Order in which line rejection reasons are reported.
+_REASON_PRIORITY = (
+    "insufficient_quantity",
+    "below_min_line_qty",
+    "price_above_margin",
+    "supplier_blacklisted",
+    "filtered_out_by_policy",
+    "min_order_amount_risk",
+    "no_available_candidates",
+)
+
+
+def _order_status(
+    partially_closed_lines: List[int], cannot_close_entries: List[Dict[str, Any]]
+) -> OrderStatus:
+    """Order status implied by a line breakdown."""
+    if cannot_close_entries:
+        return OrderStatus.CANNOT_CLOSE
+    if partially_closed_lines:
+        return OrderStatus.PARTIALLY_CLOSED
+    return OrderStatus.FULLY_CLOSED
+
 
 class StatusMixin:
     """
@@ -21,19 +44,23 @@ class StatusMixin:
         reason_map: Dict[str, List[Dict[str, Any]]] = {}
         for candidate in item.get("candidates_all", []):
             rejection_reasons = candidate.get("rejection_reasons") or []
-            reason_details = candidate.get("reason_details") or []
+            if not rejection_reasons:
+                continue
+            # First details entry per code, looked up once per candidate
+            details_by_code: Dict[Any, Any] = {}
+            for d in candidate.get("reason_details") or []:
+                details_by_code.setdefault(d.get("code"), d.get("details"))
             for reason_code in rejection_reasons:
-                detail_entry = next(
-                    (
-                        d.get("details")
-                        for d in reason_details
-                        if d.get("code") == reason_code
-                    ),
-                    {},
-                )
-                detail_entry = detail_entry or {}
-                detail_entry = {k: v for k, v in detail_entry.items() if v is not None}
-                detail_entry.setdefault("supplier_id", candidate.get("supplier_id"))
+                # Entries are stored already free of None values.
+                detail_entry = {
+                    k: v
+                    for k, v in (details_by_code.get(reason_code) or {}).items()
+                    if v is not None
+                }
+                if "supplier_id" not in detail_entry:
+                    supplier_id = candidate.get("supplier_id")
+                    if supplier_id is not None:
+                        detail_entry["supplier_id"] = supplier_id
                 reason_map.setdefault(reason_code, []).append(detail_entry)
 
         if not reason_map:
@@ -44,29 +71,15 @@ class StatusMixin:
                 }
             ]
 
-        priority = [
-            "insufficient_quantity",
-            "below_min_line_qty",
-            "price_above_margin",
-            "supplier_blacklisted",
-            "filtered_out_by_policy",
-            "min_order_amount_risk",
-            "no_available_candidates",
-        ]
-
         entries: List[Dict[str, Any]] = []
-        for reason_code in priority:
+        for reason_code in _REASON_PRIORITY:
             details_list = reason_map.get(reason_code)
             if not details_list:
                 continue
-            clean_details = [
-                {k: v for k, v in detail.items() if v is not None}
-                for detail in details_list
-            ]
-            if len(clean_details) == 1:
-                details_payload: Optional[Dict[str, Any]] = clean_details[0]
+            if len(details_list) == 1:
+                details_payload: Optional[Dict[str, Any]] = details_list[0]
             else:
-                details_payload = {"candidates": clean_details}
+                details_payload = {"candidates": details_list}
             entries.append(
                 {
                     "line_no": line_no,
@@ -101,88 +114,62 @@ class StatusMixin:
 
     def _calculate_min_order_shortfalls(self, enriched_payload: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Analyse candidates to detect min_order_amount shortfalls per line."""
-        shortfalls: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        # key -> (delta used for comparison, shortfall record)
+        shortfalls: Dict[Tuple[int, int], Tuple[float, Dict[str, Any]]] = {}
         if not enriched_payload:
             return []
         for item in enriched_payload.get("items", []):
             line_no = item.get("line_no")
-            for candidate in item.get("candidates_all", []):
-                details = candidate.get("min_order_amount_details")
+            # Classification already lists the at-risk candidates per line, so
+            # only those are visited; otherwise fall back to every candidate.
+            risks = item.get("min_order_amount_risks")
+            if risks is None:
+                risks = [
+                    candidate.get("min_order_amount_details")
+                    for candidate in item.get("candidates_all", [])
+                ]
+            for details in risks:
                 if not details:
                     continue
-                supplier_id = details.get("supplier_id") or candidate.get(
-                    "supplier_id"
-                )
+                supplier_id = details.get("supplier_id")
                 key = (line_no, supplier_id)
                 delta = details.get("delta_amount")
-                if key not in shortfalls or (
-                    delta is not None
-                    and delta
-                    < shortfalls[key].get("details", {}).get("delta_amount", float("inf"))
-                ):
-                    shortfalls[key] = {
+                current = shortfalls.get(key)
+                if current is None or (delta is not None and delta < current[0]):
+                    record = {
                         "line_no": line_no,
                         "reason": "min_order_amount_not_met",
                         "details": {
                             "supplier_id": supplier_id,
                             "required_amount": details.get("required_amount"),
                             "actual_amount": details.get("actual_amount"),
-                            "delta_amount": details.get("delta_amount"),
+                            "delta_amount": delta,
                             "suggested_qty_increase": details.get(
                                 "suggested_qty_increase"
                             ),
                         },
                     }
-        return list(shortfalls.values())
+                    shortfalls[key] = (math.inf if delta is None else delta, record)
+        return [record for _, record in shortfalls.values()]
 
     def determine_order_status(self, items: List[Dict[str, Any]]) -> OrderStatus:
         """
         Determine overall order fulfilment status.
-        """
-        fully_closed_items = 0
-        partially_closed_items = 0
-        cannot_close_items = 0
-
-        for item in items:
-            match_status = item["match"]["status"]
-
-            if match_status in [MatchStatus.NO_MATCH, MatchStatus.LOW_CONFIDENCE]:
-                cannot_close_items += 1
-                continue
-
-            candidates = item.get("candidates", [])
-            available_candidates = [c for c in candidates if c.get("is_available")]
-
-            if not available_candidates:
-                cannot_close_items += 1
-                continue
-
-            has_sufficient = any(
-                c.get("sufficient_qty") for c in available_candidates
-            )
 
-            if has_sufficient:
-                fully_closed_items += 1
-            else:
-                partially_closed_items += 1
-
-        if cannot_close_items > 0:
-            return OrderStatus.CANNOT_CLOSE
-        if partially_closed_items > 0:
-            return OrderStatus.PARTIALLY_CLOSED
-        return OrderStatus.FULLY_CLOSED
-
-    def determine_status(self, enriched_payload: Dict[str, Any]) -> Tuple[OrderStatus, Dict[str, Any]]:
+        Thin wrapper over the line classification determine_status uses.
         """
-        Determine overall order status and provide detailed breakdown.
-        """
-        self.log("Step 7: Determining order status...")
-
-        items = enriched_payload["items"]
-
-        fully_closed_lines: Set[int] = set()
-        partially_closed_lines: Set[int] = set()
+        _, partially_closed_lines, cannot_close_entries = self._classify_lines(items)
+        return _order_status(partially_closed_lines, cannot_close_entries)
+
+    def _classify_lines(
+        self, items: List[Dict[str, Any]]
+    ) -> Tuple[List[int], List[int], List[Dict[str, Any]]]:
+        """Split lines into fully closed, partially closed and cannot-close entries."""
+        # Line numbers are unique per order, so plain lists suffice here.
+        fully_closed_lines: List[int] = []
+        partially_closed_lines: List[int] = []
         cannot_close_entries: List[Dict[str, Any]] = []
+        threshold_ok = self.config.sim_threshold_ok
 
         for item in items:
             line_no = item["line_no"]
@@ -204,7 +191,7 @@ class StatusMixin:
                         "reason": "low_confidence_match",
                         "details": {
                             "score": match_info.get("score"),
-                            "threshold_ok": self.config.sim_threshold_ok,
+                            "threshold_ok": threshold_ok,
                         },
                     }
                 )
@@ -225,15 +212,31 @@ class StatusMixin:
             )
 
             if has_sufficient:
-                fully_closed_lines.add(line_no)
+                fully_closed_lines.append(line_no)
             else:
-                partially_closed_lines.add(line_no)
+                partially_closed_lines.append(line_no)
+
+        # Items usually arrive in line order, which makes these sorts linear.
+        fully_closed_lines.sort()
+        partially_closed_lines.sort()
+        return fully_closed_lines, partially_closed_lines, cannot_close_entries
+
+    def determine_status(self, enriched_payload: Dict[str, Any]) -> Tuple[OrderStatus, Dict[str, Any]]:
+        """
+        Determine overall order status and provide detailed breakdown.
+        """
+        self.log("Step 7: Determining order status...")
 
-        order_status = self.determine_order_status(items)
+        (
+            fully_closed_lines,
+            partially_closed_lines,
+            cannot_close_entries,
+        ) = self._classify_lines(enriched_payload["items"])
+        order_status = _order_status(partially_closed_lines, cannot_close_entries)
 
         status_breakdown = {
-            "fully_closed": sorted(fully_closed_lines),
-            "partially_closed": sorted(partially_closed_lines),
+            "fully_closed": fully_closed_lines,
+            "partially_closed": partially_closed_lines,
             "cannot_close": cannot_close_entries,
         }
 
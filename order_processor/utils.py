@@ -1,17 +1,42 @@
 from datetime import datetime
 from decimal import Decimal
-from typing import Any
+from typing import Any, Callable, Dict
+
+
+def _normalize_decimal(obj: Decimal) -> Any:
+    value = float(obj)
+    return int(value) if value.is_integer() else value
+
+
+def _normalize_dict(obj: Dict[Any, Any]) -> Dict[Any, Any]:
+    return {k: normalize(v) for k, v in obj.items()}
+
+
+def _normalize_list(obj: list) -> list:
+    return [normalize(v) for v in obj]
+
+
+# Handlers by exact type; checked in this order via isinstance for subclasses.
+_HANDLERS: Dict[type, Callable[[Any], Any]] = {
+    dict: _normalize_dict,
+    list: _normalize_list,
+    Decimal: _normalize_decimal,
+    datetime: datetime.isoformat,
+}
+
+# Scalars that are returned as-is without any isinstance checks.
+_PASSTHROUGH = frozenset({str, int, float, bool, type(None)})
 
 
 def normalize(obj: Any) -> Any:
     """Normalize Decimal, datetime and other types for JSON serialization."""
-    if isinstance(obj, dict):
-        return {k: normalize(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [normalize(v) for v in obj]
-    if isinstance(obj, Decimal):
-        value = float(obj)
-        return int(value) if value.is_integer() else value
-    if isinstance(obj, datetime):
-        return obj.isoformat()
+    cls = obj.__class__
+    handler = _HANDLERS.get(cls)
+    if handler is not None:
+        return handler(obj)
+    if cls in _PASSTHROUGH:
+        return obj
+    for base, handler in _HANDLERS.items():
+        if isinstance(obj, base):
+            return handler(obj)
     return obj
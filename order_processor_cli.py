@@ -6,17 +6,44 @@ Refactored to delegate business logic to the `order_processor` package.
 
 import argparse
 import json
+from decimal import Decimal
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Sequence
 
 from order_processor import OrderProcessor, ProcessorConfig, normalize
 
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib json module
+    orjson = None
+
 
 def load_message(path: Path) -> Dict[str, Any]:
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
     with path.open("r", encoding="utf-8") as handle:
         return json.load(handle)
 
 
+def _orjson_default(obj: Any) -> Any:
+    """Encode the types orjson lacks the way normalize() does."""
+    if isinstance(obj, Decimal):
+        return normalize(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dump_output(output: Dict[str, Any]) -> bytes:
+    """Serialize the processor output as indented UTF-8 JSON."""
+    if orjson is not None:
+        # orjson writes datetimes as ISO 8601 itself, so normalize() is not needed.
+        return orjson.dumps(
+            output,
+            default=_orjson_default,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(normalize(output), indent=2, ensure_ascii=False).encode("utf-8")
+
+
 def build_config(args: argparse.Namespace) -> ProcessorConfig:
     return ProcessorConfig(
         sim_threshold_ok=args.sim_threshold_ok,
@@ -28,7 +55,7 @@ def build_config(args: argparse.Namespace) -> ProcessorConfig:
     )
 
 
-def parse_args() -> argparse.Namespace:
+def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Process order from JSON"
     )
@@ -90,7 +117,15 @@ def parse_args() -> argparse.Namespace:
         "--quiet", action="store_true", help="Suppress progress messages"
     )
 
-    return parser.parse_args()
+    return parser
+
+
+# Built once at import; parse_args() may be called repeatedly by batch drivers.
+_PARSER = _build_parser()
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    return _PARSER.parse_args(argv)
 
 
 def main() -> None:
@@ -111,14 +146,13 @@ def main() -> None:
     with OrderProcessor(db_config, config=config, verbose=not args.quiet) as processor:
         output = processor.process_order(message_json)
 
-    output = normalize(output)
-    output_json = json.dumps(output, indent=2, ensure_ascii=False)
+    output_json = dump_output(output)
 
     if args.output:
-        args.output.write_text(output_json, encoding="utf-8")
+        args.output.write_bytes(output_json)
         print(f"\n-> Output written to: {args.output}")
     else:
-        print("\n" + output_json)
+        print("\n" + output_json.decode("utf-8"))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,125 @@
+import unittest
+from dataclasses import replace
+
+from order_processor.config import ProcessorConfig
+from order_processor.solver import _MODEL_CACHE, SolverMixin
+
+
+class _Solver(SolverMixin):
+    def __init__(self) -> None:
+        self.config = ProcessorConfig()
+        self.verbose = False
+        self.last_solver_info = {}
+        self.last_solution = None
+
+    def log(self, message: str) -> None:
+        pass
+
+
+def _item(line_no, prices, qty=1, pack_match_status="exactly"):
+    return {
+        "line_no": line_no,
+        "qty": qty,
+        "goes_to_solver": True,
+        "candidates": [
+            {"supplier_id": supplier_id, "price": price, "pack_match_status": pack_match_status}
+            for supplier_id, price in prices
+        ],
+    }
+
+
+def _payload(items, min_order_amounts=None):
+    min_order_amounts = min_order_amounts or {}
+    return {
+        "items": items,
+        "suppliers": {
+            s_id: {"rules": {"constraints": {"min_order_amount": min_order_amounts.get(s_id)}}}
+            for s_id in (1, 2)
+        },
+    }
+
+
+class ModelCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        _MODEL_CACHE.clear()
+
+    def test_unpriced_line_does_not_reuse_shorter_model(self) -> None:
+        solver = _Solver()
+        line_1 = _item(1, [(1, 10.0), (2, 12.0)])
+
+        first = solver.solve_assignment(1, _payload([line_1]))
+        self.assertEqual(first["status"], "OPTIMAL")
+
+        # Line 2 has only unpriced offers, so after pruning it is the same
+        # candidate set as above plus an item that cannot be covered.
+        line_2 = _item(2, [(1, None), (2, None)])
+        second = solver.solve_assignment(2, _payload([line_1, line_2]))
+        self.assertIsNone(second)
+        self.assertEqual(solver.last_solver_info["status"], "INFEASIBLE")
+
+
+class MinOrderAmountTest(unittest.TestCase):
+    def setUp(self) -> None:
+        _MODEL_CACHE.clear()
+
+    def test_sub_cent_price_below_min_order_is_infeasible(self) -> None:
+        # 0.125 x 1000 is exactly 125.00, short of the 128.00 minimum.
+        solver = _Solver()
+        payload = _payload([_item(1, [(1, 0.125)], qty=1000)], {1: 128})
+        self.assertIsNone(solver.solve_assignment(1, payload))
+        self.assertEqual(solver.last_solver_info["status"], "INFEASIBLE")
+
+    def test_sub_cent_price_at_min_order_is_feasible(self) -> None:
+        solver = _Solver()
+        payload = _payload([_item(1, [(1, 0.125)], qty=1000)], {1: 125})
+        solution = solver.solve_assignment(1, payload)
+        self.assertEqual(solution["suppliers_used"], [1])
+
+
+class ForcedAssignmentTest(unittest.TestCase):
+    def setUp(self) -> None:
+        _MODEL_CACHE.clear()
+
+    def _forced_payload(self, min_order_amounts=None):
+        return _payload(
+            [
+                _item(1, [(1, 10.0)]),
+                _item(2, [(2, 20.0)], pack_match_status="alike"),
+            ],
+            min_order_amounts,
+        )
+
+    def test_forced_minimize_suppliers(self) -> None:
+        solver = _Solver()
+        solution = solver.solve_assignment(1, self._forced_payload())
+        self.assertEqual(solver.last_solver_info["shortcut"], "forced_assignment")
+        self.assertEqual(solution["status"], "OPTIMAL")
+        self.assertEqual(solution["objective_value"], 2.0)
+        self.assertEqual(solution["suppliers_used"], [1, 2])
+        self.assertEqual([a["line_no"] for a in solution["assignments"]], [1, 2])
+
+    def test_forced_container_match(self) -> None:
+        solver = _Solver()
+        solver.config = replace(solver.config, optimization_priority="container_match")
+        solution = solver.solve_assignment(1, self._forced_payload())
+        self.assertEqual(solver.last_solver_info["shortcut"], "forced_assignment")
+        # Two suppliers at 1000 each, plus one "alike" container penalty.
+        self.assertEqual(solution["objective_value"], 2001.0)
+        self.assertEqual(solution["suppliers_used"], [1, 2])
+
+    def test_unmet_min_order_falls_through_to_cp_sat(self) -> None:
+        solver = _Solver()
+        solution = solver.solve_assignment(1, self._forced_payload({1: 100}))
+        self.assertIsNone(solution)
+        self.assertNotIn("shortcut", solver.last_solver_info)
+        self.assertEqual(solver.last_solver_info["status"], "INFEASIBLE")
+
+    def test_met_min_order_stays_forced(self) -> None:
+        solver = _Solver()
+        solution = solver.solve_assignment(1, self._forced_payload({1: 10}))
+        self.assertEqual(solver.last_solver_info["shortcut"], "forced_assignment")
+        self.assertEqual(solution["suppliers_used"], [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()